@@ -1,39 +1,151 @@
+import atexit
+import hashlib
+import json
+import uuid
+import logging
+import logging.handlers
 import os
+import queue
+import threading
 import time
-from datetime import datetime, timedelta, time as dt_time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, time as dt_time
 from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import re
-import mailtrap as mt
-import yfinance as yf
-from flask import Flask, jsonify
+import diskcache
+import orjson
+from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.triggers.cron import CronTrigger
+from flask import Flask, Response, jsonify, request
 
 
 load_dotenv()
 
-MAIL_TRAP_API_TOKEN = os.environ.get('MAIL_TRAP_API_TOKEN')
-MAIL_TRAP_SENDER_EMAIL = os.environ.get('MAIL_TRAP_SENDER_EMAIL', 'hello@demomailtrap.co')
-MAIL_TRAP_SENDER_NAME = os.environ.get('MAIL_TRAP_SENDER_NAME', 'SP500 Bot')
-MAIL_TRAP_RECIPIENTS = os.environ.get('MAIL_TRAP_RECIPIENTS', 'simone.marton89@gmail.com')
-NEWS_API_KEY = os.environ.get('NEWS_API_KEY')
-HACKCLUB_API_KEY = os.environ.get('HACKCLUB_API_KEY')
+@dataclass(frozen=True)
+class Config:
+    """All environment-derived settings, parsed once at import."""
+    mailtrap_token: str | None
+    mailtrap_sender_email: str
+    mailtrap_sender_name: str
+    recipients: tuple[str, ...]
+    news_api_key: str | None
+    hackclub_api_key: str | None
+    market_timezone: str
+    alert_times_str: str
+    schedule_at_market_open: bool
+    ai_cache_dir: str
+
+CFG = Config(
+    mailtrap_token=os.environ.get('MAIL_TRAP_API_TOKEN'),
+    mailtrap_sender_email=os.environ.get('MAIL_TRAP_SENDER_EMAIL', 'hello@demomailtrap.co'),
+    mailtrap_sender_name=os.environ.get('MAIL_TRAP_SENDER_NAME', 'SP500 Bot'),
+    recipients=tuple(
+        addr.strip()
+        for addr in os.environ.get('MAIL_TRAP_RECIPIENTS', 'simone.marton89@gmail.com').split(',')
+        if addr.strip()
+    ),
+    news_api_key=os.environ.get('NEWS_API_KEY'),
+    hackclub_api_key=os.environ.get('HACKCLUB_API_KEY'),
+    market_timezone=os.environ.get('MARKET_TIMEZONE', 'America/New_York'),
+    alert_times_str=os.environ.get('MARKET_ALERT_TIMES', '09:30,15:30'),
+    schedule_at_market_open=os.environ.get('SCHEDULE_AT_MARKET_OPEN', 'false').lower() in {'1', 'true', 'yes', 'on'},
+    ai_cache_dir=os.environ.get('AI_CACHE_DIR', '.sp500bot_cache'),
+)
+
 LOG_FILE = 'sp500bot.log'
-MARKET_TIMEZONE = os.environ.get('MARKET_TIMEZONE', 'America/New_York')
-MARKET_ALERT_TIMES_STR = os.environ.get('MARKET_ALERT_TIMES', '09:30,15:30')
-SCHEDULE_AT_MARKET_OPEN = os.environ.get('SCHEDULE_AT_MARKET_OPEN', 'false').lower() in {'1', 'true', 'yes', 'on'}
+AI_CACHE_TTL = 1800
 MARKET_ZONE = None
 MARKET_ALERT_TIMES = None
 
+class _TokenBucket:
+    """Simple thread-safe token bucket; acquire() blocks until a token is free."""
+
+    def __init__(self, calls, period):
+        self.capacity = calls
+        self.tokens = float(calls)
+        self.fill_rate = calls / period
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.fill_rate
+            time.sleep(wait)
+
+_NEWS_BUCKET = _TokenBucket(calls=100, period=86400)
+_YAHOO_BUCKET = _TokenBucket(calls=30, period=60)
+_AI_BUCKET = _TokenBucket(calls=60, period=60)
+
+# One alternation for the free-text fallback parse: group 1 action, group 2
+# stop loss, group 3 take profit. The reason is a separate pass because an
+# anchored reason branch would swallow single-line responses whole before the
+# other tokens on the line could match.
+_AI_RE = re.compile(
+    r'\b(BUY|SELL|HOLD)\b'
+    r'|(?:Stop\s*Loss)[^\d.%]*([\d.,]+%?)'
+    r'|(?:Take\s*Profit)[^\d.%]*([\d.,]+%?)',
+    re.IGNORECASE,
+)
+_REASON_RE = re.compile(
+    r'reason[^:\n]*:\s*((?:(?!stop\s*loss|take\s*profit)[^\n])+)',
+    re.IGNORECASE,
+)
+
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=1.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        respect_retry_after_header=True,
+    ),
+))
+# Yahoo throttles the default python-requests agent string.
+SESSION.headers['User-Agent'] = (
+    'Mozilla/5.0 (X11; Linux x86_64; rv:115.0) Gecko/20100101 Firefox/115.0'
+)
+
+_logger = logging.getLogger('sp500bot')
+_logger.setLevel(logging.INFO)
+_log_handler = logging.handlers.RotatingFileHandler(LOG_FILE, maxBytes=1_000_000, backupCount=3)
+_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+_log_queue = queue.Queue(-1)
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+_logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+
 def log_event(event):
-    with open(LOG_FILE, 'a') as f:
-        f.write(f"{datetime.now().isoformat()} - {event}\n")
+    _logger.info(event)
+
+_HAS_NEWS = bool(CFG.news_api_key)
+_HAS_AI = bool(CFG.hackclub_api_key)
+if not _HAS_NEWS:
+    log_event('Missing NEWS_API_KEY environment variable. Create a .env file or export it in the shell.')
+    print('Missing NEWS_API_KEY. Set it in a .env file or export it in your shell.')
+if not _HAS_AI:
+    log_event('Missing HACKCLUB_API_KEY environment variable.')
+    print('Missing HACKCLUB_API_KEY. Set it in your .env or export it.')
 
 def _init_market_zone():
     try:
-        return ZoneInfo(MARKET_TIMEZONE)
+        return ZoneInfo(CFG.market_timezone)
     except Exception:
-        message = f"Invalid MARKET_TIMEZONE '{MARKET_TIMEZONE}'. Falling back to UTC."
+        message = f"Invalid MARKET_TIMEZONE '{CFG.market_timezone}'. Falling back to UTC."
         log_event(message)
         print(message)
         return ZoneInfo("UTC")
@@ -60,33 +172,51 @@ def _parse_alert_times(value):
         parsed_times = [dt_time(hour=9, minute=30), dt_time(hour=15, minute=30)]
     return sorted(parsed_times)
 
-MARKET_ALERT_TIMES = _parse_alert_times(MARKET_ALERT_TIMES_STR)
+MARKET_ALERT_TIMES = _parse_alert_times(CFG.alert_times_str)
+
+MAILTRAP_BATCH_URL = 'https://bulk.api.mailtrap.io/api/batch'
 
 def send_email(subject, body):
-    if not MAIL_TRAP_API_TOKEN:
+    if not CFG.mailtrap_token:
         message = 'Missing MAIL_TRAP_API_TOKEN environment variable. Create a .env file or export it in the shell.'
         log_event(message)
         print(message)
         return False
 
-    recipients = [addr.strip() for addr in MAIL_TRAP_RECIPIENTS.split(',') if addr.strip()]
-    if not recipients:
+    if not CFG.recipients:
         message = 'MAIL_TRAP_RECIPIENTS is empty. Configure at least one recipient email.'
         log_event(message)
         print(message)
         return False
 
+    payload = {
+        "base": {
+            "from": {"email": CFG.mailtrap_sender_email, "name": CFG.mailtrap_sender_name},
+            "subject": subject,
+            "text": body,
+            "category": "SP500 Bot Alert",
+        },
+        "requests": [{"to": [{"email": email}]} for email in CFG.recipients],
+    }
+    headers = {
+        "Authorization": f"Bearer {CFG.mailtrap_token}",
+        "Content-Type": "application/json",
+    }
     try:
-        mail = mt.Mail(
-            sender=mt.Address(email=MAIL_TRAP_SENDER_EMAIL, name=MAIL_TRAP_SENDER_NAME),
-            to=[mt.Address(email=email) for email in recipients],
-            subject=subject,
-            text=body,
-            category="SP500 Bot Alert",
-        )
-        client = mt.MailtrapClient(token=MAIL_TRAP_API_TOKEN)
-        response = client.send(mail)
-        log_event(f"Email sent successfully via Mailtrap: {response}")
+        resp = SESSION.post(MAILTRAP_BATCH_URL, headers=headers, data=orjson.dumps(payload), timeout=(3.05, 10))
+        resp.raise_for_status()
+        statuses = orjson.loads(resp.content).get('responses', [])
+        failures = [
+            (email, status)
+            for email, status in zip(CFG.recipients, statuses)
+            if not status.get('success')
+        ]
+        for email, status in failures:
+            log_event(f"Email to {email} failed: {status.get('errors', status)}")
+        if failures:
+            print(f"Email failed for {len(failures)} of {len(CFG.recipients)} recipients.")
+            return False
+        log_event(f"Batch email sent successfully via Mailtrap to {len(CFG.recipients)} recipient(s).")
         print("Email sent successfully!")
         return True
     except Exception as e:
@@ -94,99 +224,189 @@ def send_email(subject, body):
         print(f"Error sending email: {e}")
         return False
 
-def fetch_sp500_price():
+CHART_URL = 'https://query1.finance.yahoo.com/v8/finance/chart/%5EGSPC'
+PRICE_CACHE_TTL = 30
+NEWS_CACHE_TTL = 300
+
+_cache_lock = threading.Lock()
+_cache_store = {}
+_cache_key_locks = {}
+
+def _cached(key, ttl, fn):
+    """Return a cached value for key, or compute it with fn under a single-flight lock.
+
+    Single-flight is per key: duplicate misses for the same key share one
+    fn() call, while different keys (news vs price) compute concurrently.
+    Falsy results (failed fetches) are not cached so the next caller retries.
+    """
+    entry = _cache_store.get(key)
+    if entry and time.monotonic() < entry[0]:
+        return entry[1]
+    with _cache_lock:
+        key_lock = _cache_key_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        entry = _cache_store.get(key)
+        if entry and time.monotonic() < entry[0]:
+            return entry[1]
+        value = fn()
+        if value:
+            _cache_store[key] = (time.monotonic() + ttl, value)
+        return value
+
+def _fetch_price_uncached():
     try:
-        ticker = yf.Ticker("^GSPC")
-        price = ticker.history(period="1d")["Close"].iloc[0]
-        return float(price)
+        _YAHOO_BUCKET.acquire()
+        resp = SESSION.get(CHART_URL, params={'range': '1d', 'interval': '1d'}, timeout=5)
+        resp.raise_for_status()
+        meta = orjson.loads(resp.content)['chart']['result'][0]['meta']
+        return float(meta['regularMarketPrice'])
     except Exception as e:
         log_event(f"Error fetching S&P 500 price from Yahoo: {e}")
         print(f"Error fetching S&P 500 price from Yahoo: {e}")
         return None
 
-def fetch_sp500_news():
-    if not NEWS_API_KEY:
-        log_event('Missing NEWS_API_KEY environment variable. Create a .env file or export it in the shell.')
-        print('Missing NEWS_API_KEY. Set it in a .env file or export it in your shell.')
-        return []
-    url = 'https://newsapi.org/v2/everything'
+def fetch_sp500_price():
+    return _cached('price', PRICE_CACHE_TTL, _fetch_price_uncached)
+
+NEWS_URL = 'https://newsapi.org/v2/everything'
+NEWS_QUERIES = [
+    'S&P 500 OR SP500 OR "S&P 500"',
+    'SPX OR "S&P 500" index',
+    'Federal Reserve S&P',
+]
+MAX_HEADLINES = 5
+
+def _fetch_news_query(query):
     params = {
-        'q': 'S&P 500 OR SP500 OR "S&P 500"',
+        'q': query,
         'language': 'en',
         'sortBy': 'publishedAt',
-        'pageSize': 5,
+        'pageSize': MAX_HEADLINES,
     }
     try:
-        headers = {"X-Api-Key": NEWS_API_KEY}
-        resp = requests.get(url, headers=headers, params=params)
+        _NEWS_BUCKET.acquire()
+        headers = {"X-Api-Key": CFG.news_api_key}
+        resp = SESSION.get(NEWS_URL, headers=headers, params=params, timeout=(3.05, 10))
         resp.raise_for_status()
-        data = resp.json()
-        headlines = [a['title'] for a in data.get('articles', [])]
-        return headlines
+        data = orjson.loads(resp.content)
+        return data.get('articles', [])
     except Exception as e:
         try:
             error_body = resp.text if 'resp' in locals() else ''
         except Exception:
             error_body = ''
-        log_event(f"Error fetching news: {e} {error_body}")
+        log_event(f"Error fetching news for '{query}': {e} {error_body}")
         print(f"Error fetching news: {e}")
         return []
 
+def _fetch_news_uncached():
+    with ThreadPoolExecutor(max_workers=len(NEWS_QUERIES)) as executor:
+        results = executor.map(_fetch_news_query, NEWS_QUERIES)
+    articles = {}
+    for article in (a for batch in results for a in batch):
+        title = article.get('title')
+        if title and title not in articles:
+            articles[title] = article.get('publishedAt', '')
+    newest_first = sorted(articles, key=articles.get, reverse=True)
+    return newest_first[:MAX_HEADLINES]
+
+def fetch_sp500_news():
+    if not _HAS_NEWS:
+        return []
+    return _cached('news', NEWS_CACHE_TTL, _fetch_news_uncached)
+
+_AI_CACHE = diskcache.Cache(CFG.ai_cache_dir, size_limit=50_000_000)
+_ai_lock = threading.Lock()
+
+def _ai_cache_key(headlines, price):
+    payload = {"h": sorted(headlines), "p": round(price or 0, 0)}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
 def interpret_news_with_ai(headlines, price=None):
-    if not HACKCLUB_API_KEY:
-        log_event('Missing HACKCLUB_API_KEY environment variable.')
-        print('Missing HACKCLUB_API_KEY. Set it in your .env or export it.')
+    if not _HAS_AI:
         return "Error: Missing HACKCLUB_API_KEY."
+    cache_key = _ai_cache_key(headlines, price)
+    cached = _AI_CACHE.get(cache_key)
+    if cached is not None:
+        log_event('AI cache hit; skipping HackClub API call.')
+        return cached
+    with _ai_lock:
+        return _interpret_news_uncached(cache_key, headlines, price)
+
+def _interpret_news_uncached(cache_key, headlines, price):
+    # Re-check under the lock: a concurrent caller with the same key may have
+    # just paid for this answer.
+    cached = _AI_CACHE.get(cache_key)
+    if cached is not None:
+        log_event('AI cache hit; skipping HackClub API call.')
+        return cached
     prompt = (
-        "You are advising a trader who always uses 20x leverage and trades S&P 500 on Revolut. "
-        "Your recommendations must be conservative and always include a stop loss and take profit, based on the strength of the news and current market conditions. "
-        "Given these news headlines about the S&P 500, should the trader buy, sell, or hold? "
-        "Reply with one of: BUY, SELL, HOLD. Then give a one-sentence reason. "
-        "Then suggest a stop loss and take profit (as price levels or percentages). "
-        f"Current S&P 500 price: {price}. "
-        f"Headlines: {headlines}"
+        "Conservative advice for a 20x-leverage S&P 500 trader. Given the news, reply with JSON: "
+        '{"action": "BUY"|"SELL"|"HOLD", "reason": str, "stop_loss": float, "take_profit": float}. '
+        f"Price: {price}. Headlines: {headlines}"
     )
     url = "https://ai.hackclub.com/proxy/v1/chat/completions"
     headers = {
-        "Authorization": f"Bearer {HACKCLUB_API_KEY}",
+        "Authorization": f"Bearer {CFG.hackclub_api_key}",
         "Content-Type": "application/json"
     }
     data = {
         "model": "qwen/qwen3-32b",
-        "messages": [{"role": "user", "content": prompt}]
+        "messages": [{"role": "user", "content": prompt}],
+        "response_format": {"type": "json_object"}
     }
     try:
-        resp = requests.post(url, headers=headers, json=data)
+        _AI_BUCKET.acquire()
+        resp = SESSION.post(url, headers=headers, data=orjson.dumps(data), timeout=(3.05, 60))
         resp.raise_for_status()
-        response_json = resp.json()
-        return response_json["choices"][0]["message"]["content"]
+        response_json = orjson.loads(resp.content)
+        result = response_json["choices"][0]["message"]["content"]
+        _AI_CACHE.set(cache_key, result, expire=AI_CACHE_TTL)
+        return result
     except Exception as e:
         log_event(f"Error with HackClub AI: {e}")
         print(f"Error with HackClub AI: {e}")
         return "Error: Could not get AI interpretation."
 
 def parse_ai_response(ai_response):
-    action = 'HOLD'
-    reason = ''
+    try:
+        parsed = orjson.loads(ai_response)
+    except Exception:
+        parsed = None
+    if isinstance(parsed, dict):
+        action = str(parsed.get('action', 'HOLD')).upper()
+        if action not in ('BUY', 'SELL', 'HOLD'):
+            action = 'HOLD'
+        reason = str(parsed.get('reason', '')).strip()
+        stop_loss = parsed.get('stop_loss')
+        take_profit = parsed.get('take_profit')
+        return action, reason, stop_loss, take_profit
+    action = None
     stop_loss = None
     take_profit = None
-    for word in ['BUY', 'SELL', 'HOLD']:
-        if word in ai_response.upper():
-            action = word
-            break
-    stop_loss_match = re.search(r'(Stop\s*Loss|stop\s*loss)[^\d\.%]*([\d\.,]+%?)', ai_response, re.IGNORECASE)
-    take_profit_match = re.search(r'(Take\s*Profit|take\s*profit)[^\d\.%]*([\d\.,]+%?)', ai_response, re.IGNORECASE)
-    if stop_loss_match:
-        stop_loss = stop_loss_match.group(2).replace(',', '')
-    if take_profit_match:
-        take_profit = take_profit_match.group(2).replace(',', '')
-    lines = ai_response.split('\n')
-    for line in lines:
-        if 'reason' in line.lower():
-            reason = line.split(':', 1)[-1].strip()
+    for match in _AI_RE.finditer(ai_response):
+        if match.group(1) is not None:
+            if action is None:
+                action = match.group(1).upper()
+        elif match.group(2) is not None:
+            if stop_loss is None:
+                stop_loss = match.group(2).replace(',', '')
+        elif take_profit is None:
+            take_profit = match.group(3).replace(',', '')
+        if action and stop_loss and take_profit:
             break
-    if not reason and len(lines) > 1:
-        reason = lines[1].strip()
+    if action is None:
+        action = 'HOLD'
+    reason_match = _REASON_RE.search(ai_response)
+    if reason_match:
+        reason = reason_match.group(1).strip()
+    else:
+        reason = ''
+        newline = ai_response.find('\n')
+        if newline != -1:
+            end = ai_response.find('\n', newline + 1)
+            second_line = ai_response[newline + 1:] if end == -1 else ai_response[newline + 1:end]
+            reason = second_line.strip()
     return action, reason, stop_loss, take_profit
 
 def suggest_stoploss_takeprofit(price, action):
@@ -203,36 +423,16 @@ def suggest_stoploss_takeprofit(price, action):
         take_profit = None
     return (stop_loss, take_profit)
 
-def next_alert_datetime(reference=None):
-    if reference is None:
-        reference = datetime.now(MARKET_ZONE)
-    else:
-        if reference.tzinfo is None:
-            reference = reference.replace(tzinfo=MARKET_ZONE)
-        else:
-            reference = reference.astimezone(MARKET_ZONE)
-
-    if reference.weekday() >= 5:
-        next_date = _next_weekday_date(reference.date())
-        return datetime.combine(next_date, MARKET_ALERT_TIMES[0], tzinfo=MARKET_ZONE)
-
-    for alert_time in MARKET_ALERT_TIMES:
-        candidate = datetime.combine(reference.date(), alert_time, tzinfo=MARKET_ZONE)
-        if reference < candidate:
-            return candidate
-
-    next_date = _next_weekday_date(reference.date() + timedelta(days=1))
-    return datetime.combine(next_date, MARKET_ALERT_TIMES[0], tzinfo=MARKET_ZONE)
-
-def _next_weekday_date(date_value):
-    next_date = date_value
-    while next_date.weekday() >= 5:
-        next_date += timedelta(days=1)
-    return next_date
+def _fetch_news_and_price():
+    """Fetch headlines and price concurrently; they are independent round-trips."""
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        news_future = executor.submit(fetch_sp500_news)
+        price_future = executor.submit(fetch_sp500_price)
+        return news_future.result(), price_future.result()
 
 def get_trading_results():
     """Get trading results without sending email. Returns a dictionary with all results."""
-    headlines = fetch_sp500_news()
+    headlines, price = _fetch_news_and_price()
     if not headlines:
         log_event('No news found.')
         return {
@@ -244,7 +444,6 @@ def get_trading_results():
             'take_profit': None,
             'headlines': []
         }
-    price = fetch_sp500_price()
     ai_result = interpret_news_with_ai(headlines, price)
     action, reason, stop_loss, take_profit = parse_ai_response(ai_result)
     
@@ -258,25 +457,33 @@ def get_trading_results():
     }
 
 def main():
-    headlines = fetch_sp500_news()
+    now = datetime.now(MARKET_ZONE)
+    if now.weekday() >= 5:
+        log_event('Market closed (weekend); skipping run.')
+        print('Market closed (weekend); skipping run.')
+        return
+    headlines, price = _fetch_news_and_price()
     if not headlines:
         print('No news found.')
         log_event('No news found.')
         return
-    price = fetch_sp500_price()
     ai_result = interpret_news_with_ai(headlines, price)
     action, reason, stop_loss, take_profit = parse_ai_response(ai_result)
     subject = f'S&P 500 Trading Alert: {action}'
-    body = (
-        f"AI Trading Signal: {action}\n\n"
-        f"Reason: {reason}\n\n"
-        f"Current S&P 500 Price: {price}\n"
-    )
+    parts = [
+        f"AI Trading Signal: {action}",
+        "",
+        f"Reason: {reason}",
+        "",
+        f"Current S&P 500 Price: {price}",
+    ]
     if stop_loss:
-        body += f"Suggested Stop Loss: {stop_loss}\n"
+        parts.append(f"Suggested Stop Loss: {stop_loss}")
     if take_profit:
-        body += f"Suggested Take Profit: {take_profit}\n"
-    body += ("\nHeadlines:\n" + '\n'.join(headlines))
+        parts.append(f"Suggested Take Profit: {take_profit}")
+    parts.extend(["", "Headlines:"])
+    parts.extend(headlines)
+    body = '\n'.join(parts)
 
     email_sent = send_email(subject, body)
     if email_sent:
@@ -287,24 +494,20 @@ def main():
 def run_alert_scheduler():
     times_display = ', '.join(t.strftime('%H:%M') for t in MARKET_ALERT_TIMES)
     message = (
-        f"Scheduler enabled. Alerts will run at {times_display} {MARKET_TIMEZONE} on weekdays."
+        f"Scheduler enabled. Alerts will run at {times_display} {CFG.market_timezone} on weekdays."
     )
     log_event(message)
     print(message)
-    while True:
-        now = datetime.now(MARKET_ZONE)
-        next_run = next_alert_datetime(now)
-        wait_seconds = max(0, (next_run - now).total_seconds())
-        minutes = wait_seconds / 60 if wait_seconds else 0
-        print(f"Next alert scheduled for {next_run.isoformat()} ({minutes:.1f} minutes).")
-        time.sleep(wait_seconds)
-        try:
-            main()
-        except Exception as exc:
-            log_event(f"Scheduled run failed: {exc}")
-            print(f"Scheduled run failed: {exc}")
-        # small delay to avoid tight loops immediately after execution
-        time.sleep(1)
+    scheduler = BlockingScheduler(timezone=MARKET_ZONE)
+    for alert_time in MARKET_ALERT_TIMES:
+        scheduler.add_job(
+            main,
+            CronTrigger(day_of_week='mon-fri', hour=alert_time.hour, minute=alert_time.minute, jitter=60),
+            misfire_grace_time=300,
+            coalesce=True,
+            max_instances=1,
+        )
+    scheduler.start()
 
 
 HTML_PAGE = '''<!DOCTYPE html>
@@ -567,79 +770,197 @@ HTML_PAGE = '''<!DOCTYPE html>
     </div>
 
     <script>
-        async function fetchResults() {
+        function renderResults(data) {
+            document.getElementById('action').textContent = data.action || 'HOLD';
+            document.getElementById('action').className = 'action ' + (data.action || 'HOLD');
+            document.getElementById('reason').textContent = data.reason || 'No reason provided';
+            document.getElementById('price').textContent = data.price ? `$${data.price.toFixed(2)}` : 'N/A';
+            document.getElementById('stopLoss').textContent = data.stop_loss || 'N/A';
+            document.getElementById('takeProfit').textContent = data.take_profit || 'N/A';
+
+            const headlinesDiv = document.getElementById('headlines');
+            if (data.headlines && data.headlines.length > 0) {
+                headlinesDiv.innerHTML = data.headlines.map(headline =>
+                    `<div class="headline-item">${headline}</div>`
+                ).join('');
+            } else {
+                headlinesDiv.innerHTML = '<div class="headline-item">No headlines available</div>';
+            }
+
+            document.getElementById('timestamp').textContent =
+                `Last updated: ${new Date().toLocaleString()}`;
+
+            document.getElementById('results').classList.add('show');
+        }
+
+        const RESULT_TTL_MS = 60000;
+        let activeSource = null;
+
+        function fetchResults() {
             const button = document.getElementById('fetchButton');
             const loading = document.getElementById('loading');
             const results = document.getElementById('results');
             const error = document.getElementById('error');
-            
+
             // Reset UI
             button.disabled = true;
             loading.style.display = 'block';
-            results.classList.remove('show');
             error.style.display = 'none';
-            
-            try {
-                const apiUrl = window.location.origin + '/api/get-results';
-                const response = await fetch(apiUrl);
-                
-                if (!response.ok) {
-                    throw new Error(`HTTP error! status: ${response.status}`);
-                }
-                
-                const data = await response.json();
-                
-                // Display results
-                document.getElementById('action').textContent = data.action || 'HOLD';
-                document.getElementById('action').className = 'action ' + (data.action || 'HOLD');
-                document.getElementById('reason').textContent = data.reason || 'No reason provided';
-                document.getElementById('price').textContent = data.price ? `$${data.price.toFixed(2)}` : 'N/A';
-                document.getElementById('stopLoss').textContent = data.stop_loss || 'N/A';
-                document.getElementById('takeProfit').textContent = data.take_profit || 'N/A';
-                
-                // Display headlines
-                const headlinesDiv = document.getElementById('headlines');
-                if (data.headlines && data.headlines.length > 0) {
-                    headlinesDiv.innerHTML = data.headlines.map(headline => 
-                        `<div class="headline-item">${headline}</div>`
-                    ).join('');
-                } else {
-                    headlinesDiv.innerHTML = '<div class="headline-item">No headlines available</div>';
-                }
-                
-                // Display timestamp
-                document.getElementById('timestamp').textContent = 
-                    `Last updated: ${new Date().toLocaleString()}`;
-                
-                results.classList.add('show');
-                
-            } catch (err) {
-                error.textContent = `Error: ${err.message}`;
-                error.style.display = 'block';
-            } finally {
+
+            // Serve repeat clicks within the same 60s bucket from
+            // sessionStorage without touching the backend at all.
+            const cacheKey = 'sp500:' + Math.floor(Date.now() / RESULT_TTL_MS);
+            const cached = sessionStorage.getItem(cacheKey);
+            if (cached) {
+                renderResults(JSON.parse(cached));
                 button.disabled = false;
                 loading.style.display = 'none';
+                return;
+            }
+
+            // Drop any superseded stream before opening a new one.
+            if (activeSource) {
+                activeSource.close();
             }
+
+            // The stream pushes the last cached verdict immediately (if any),
+            // then a final event when the shared in-flight run completes.
+            const source = new EventSource(window.location.origin + '/api/stream');
+            activeSource = source;
+
+            const finish = () => {
+                source.close();
+                if (activeSource === source) {
+                    activeSource = null;
+                }
+                button.disabled = false;
+                loading.style.display = 'none';
+            };
+
+            source.onmessage = (event) => {
+                const payload = JSON.parse(event.data);
+                if (payload.result && !payload.result.error) {
+                    renderResults(payload.result);
+                }
+                if (payload.state === 'final') {
+                    if (payload.result && payload.result.error) {
+                        error.textContent = `Error: ${payload.result.error}`;
+                        error.style.display = 'block';
+                    } else if (payload.result) {
+                        try {
+                            sessionStorage.setItem(cacheKey, JSON.stringify(payload.result));
+                        } catch (e) {
+                            // Storage full or unavailable; caching is best-effort.
+                        }
+                    }
+                    finish();
+                }
+            };
+
+            source.onerror = () => {
+                error.textContent = 'Error: lost connection to the results stream';
+                error.style.display = 'block';
+                finish();
+            };
         }
     </script>
 </body>
 </html>'''
 
+_HTML_BYTES = HTML_PAGE.encode('utf-8')
+_HTML_ETAG = '"' + hashlib.md5(_HTML_BYTES).hexdigest() + '"'
+
 # Flask app setup
 app = Flask(__name__)
 
+# Background jobs for the slow news+AI pipeline, so request threads return
+# immediately. An in-process pool plays the role of a task queue here; the
+# deployment has no broker to back something like Celery.
+_JOBS = {}
+_JOBS_LOCK = threading.Lock()
+_JOB_EXECUTOR = ThreadPoolExecutor(max_workers=2)
+_MAX_FINISHED_JOBS = 50
+
+_last_result = None
+
+def _run_trading_job(job_id):
+    global _last_result
+    try:
+        state, result = 'SUCCESS', get_trading_results()
+        if 'error' not in result:
+            _last_result = result
+    except Exception as e:
+        log_event(f"Trading job {job_id} failed: {e}")
+        state, result = 'FAILURE', {'error': str(e)}
+    with _JOBS_LOCK:
+        _JOBS[job_id] = (state, result)
+        while len(_JOBS) > _MAX_FINISHED_JOBS:
+            _JOBS.pop(next(iter(_JOBS)))
+
+# Single-flight holder for the SSE stream: concurrent clients share one
+# in-flight pipeline run instead of each starting their own.
+class _Flight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+_flight_lock = threading.Lock()
+_flight = None
+
+def _run_flight(flight):
+    global _flight, _last_result
+    try:
+        flight.result = get_trading_results()
+        if 'error' not in flight.result:
+            _last_result = flight.result
+    except Exception as e:
+        log_event(f"Streamed trading run failed: {e}")
+        flight.result = {'error': str(e)}
+    with _flight_lock:
+        _flight = None
+    flight.event.set()
+
 @app.route('/')
 def index():
-    return HTML_PAGE
+    if request.headers.get('If-None-Match') == _HTML_ETAG:
+        return '', 304
+    resp = Response(_HTML_BYTES, mimetype='text/html')
+    resp.headers['ETag'] = _HTML_ETAG
+    resp.headers['Cache-Control'] = 'public, max-age=300'
+    return resp
 
 @app.route('/api/get-results')
 def api_get_results():
-    try:
-        results = get_trading_results()
-        return jsonify(results)
-    except Exception as e:
-        log_event(f"Error in API endpoint: {e}")
-        return jsonify({'error': str(e)}), 500
+    job_id = uuid.uuid4().hex
+    with _JOBS_LOCK:
+        _JOBS[job_id] = ('PENDING', None)
+    _JOB_EXECUTOR.submit(_run_trading_job, job_id)
+    return jsonify({'id': job_id})
+
+@app.route('/api/result/<job_id>')
+def api_get_result(job_id):
+    with _JOBS_LOCK:
+        job = _JOBS.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job id.'}), 404
+    state, result = job
+    return jsonify({'state': state, 'result': result})
+
+@app.route('/api/stream')
+def api_stream():
+    def generate():
+        global _flight
+        if _last_result is not None:
+            yield 'data: ' + json.dumps({'state': 'cached', 'result': _last_result}) + '\n\n'
+        with _flight_lock:
+            if _flight is None:
+                _flight = _Flight()
+                _JOB_EXECUTOR.submit(_run_flight, _flight)
+            flight = _flight
+        flight.event.wait(timeout=120)
+        result = flight.result if flight.result is not None else {'error': 'Timed out waiting for results.'}
+        yield 'data: ' + json.dumps({'state': 'final', 'result': result}) + '\n\n'
+    return Response(generate(), mimetype='text/event-stream')
 
 if __name__ == "__main__":
     import sys
@@ -648,8 +969,22 @@ if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == '--web':
         port = int(os.environ.get('PORT', 5001))
         print(f"Starting web server on http://0.0.0.0:{port}")
-        app.run(host='0.0.0.0', port=port, debug=False)
-    elif SCHEDULE_AT_MARKET_OPEN:
+        try:
+            # Default to one worker: _JOBS, _flight, and _last_result live in
+            # process memory, so polls and streams must land on the process
+            # that owns them. The gthread threads supply the I/O concurrency.
+            os.execvp('gunicorn', [
+                'gunicorn',
+                '-k', 'gthread',
+                '-w', os.environ.get('WEB_WORKERS', '1'),
+                '--threads', os.environ.get('WEB_THREADS', '8'),
+                '-b', f'0.0.0.0:{port}',
+                'wsgi:app',
+            ])
+        except OSError:
+            print('gunicorn not found; falling back to the Flask dev server.')
+            app.run(host='0.0.0.0', port=port, debug=False)
+    elif CFG.schedule_at_market_open:
         run_alert_scheduler()
     else:
         main()
@@ -0,0 +1,4 @@
+"""Gunicorn entrypoint. The bot ships as a flat __init__.py in the app
+directory, so the module is importable under that name."""
+
+from __init__ import app